@@ -1,10 +1,15 @@
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+import orjson
 import os
 import logging
 import json
+import re
 from datetime import datetime
 import random
+from collections import Counter
+from functools import lru_cache
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -15,14 +20,75 @@ except ImportError:
     TEXTBLOB_AVAILABLE = False
     print("TextBlob not available, using simple sentiment analysis")
 
+def _json_default(obj):
+    """Serialize values orjson rejects, such as pandas and Firestore timestamps"""
+    # pandas' NaT is a datetime that isn't equal to itself; serialize it as null
+    if isinstance(obj, datetime) and obj != obj:
+        return None
+    # Datetime subclasses become plain datetimes so they format like any other
+    if isinstance(obj, datetime):
+        return datetime.combine(obj.date(), obj.timetz())
+    return obj.isoformat() if hasattr(obj, 'isoformat') else str(obj)
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson
+
+    numpy values are serialized natively and datetimes as ISO 8601 (naive ones
+    as UTC), unlike the RFC 822 dates of Flask's default provider. Types orjson
+    doesn't know go through _json_default.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj,
+            default=_json_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        ).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Load mood detection models at import, so `gunicorn --preload` loads them once
+# in the master and forked workers share the weights
+if os.environ.get('PRELOAD_MODELS', '').lower() == 'true':
+    from services.firebase_service import preload_mood_detector
+    preload_mood_detector()
+
+EMOTION_EMOJIS = {
+    'happy': '😊', 'sad': '😢', 'angry': '😠', 'anxious': '😟',
+    'excited': '🤩', 'calm': '😌', 'neutral': '😐', 'grateful': '🙏'
+}
+
+# Keyword lists used by simple mood detection
+MOOD_KEYWORDS = {
+    'happy': ['happy', 'joy', 'glad', 'great', 'wonderful', 'amazing', 'cheerful', 'delighted'],
+    'sad': ['sad', 'depressed', 'unhappy', 'crying', 'lonely', 'heartbroken', 'miserable', 'upset'],
+    'angry': ['angry', 'mad', 'furious', 'annoyed', 'irritated', 'frustrated', 'rage'],
+    'anxious': ['anxious', 'worried', 'nervous', 'stressed', 'scared', 'afraid', 'panic'],
+    'excited': ['excited', 'thrilled', 'eager', 'pumped', 'ecstatic', 'looking forward'],
+    'calm': ['calm', 'peaceful', 'relaxed', 'serene', 'content', 'tranquil'],
+    'grateful': ['grateful', 'thankful', 'blessed', 'appreciate', 'fortunate']
+}
+MOOD_NAMES = list(MOOD_KEYWORDS)
+_KEYWORD_MOOD_IDS = {
+    keyword: mood_id
+    for mood_id, keywords in enumerate(MOOD_KEYWORDS.values())
+    for keyword in keywords
+}
+# One alternation, longest keywords first, so each text is scanned once
+_MOOD_KEYWORD_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(k) for k in sorted(_KEYWORD_MOOD_IDS, key=len, reverse=True)) + r')\b'
+)
+
 @app.route('/', methods=['GET'])
 def welcome():
     """Welcome endpoint"""
@@ -79,6 +145,51 @@ def analyze_mood():
         logger.error(f"Error analyzing mood: {str(e)}")
         return jsonify({'error': 'Failed to analyze mood'}), 500
 
+@lru_cache(maxsize=4096)
+def simple_mood_detection(text):
+    """Detect mood from keyword matches, falling back to TextBlob polarity
+
+    Results are cached per text (autosaves and retries resend the same entry),
+    so callers must treat the returned dict as read-only.
+    """
+    counts = [0] * len(MOOD_NAMES)
+    keywords = set()
+    for match in _MOOD_KEYWORD_RE.finditer(text.lower()):
+        keyword = match.group(1)
+        counts[_KEYWORD_MOOD_IDS[keyword]] += 1
+        keywords.add(keyword)
+
+    sentiment_score = TextBlob(text).sentiment.polarity if TEXTBLOB_AVAILABLE else 0.0
+
+    total_matches = sum(counts)
+    if total_matches:
+        mood_id = max(range(len(counts)), key=counts.__getitem__)
+        primary_mood = MOOD_NAMES[mood_id]
+        confidence = counts[mood_id] / total_matches
+    elif sentiment_score > 0.3:
+        primary_mood = 'happy'
+        confidence = min(sentiment_score, 1.0)
+    elif sentiment_score < -0.3:
+        primary_mood = 'sad'
+        confidence = min(abs(sentiment_score), 1.0)
+    else:
+        primary_mood = 'neutral'
+        confidence = 0.5
+
+    emotions = {
+        mood: round(count / total_matches, 3)
+        for mood, count in zip(MOOD_NAMES, counts)
+        if count
+    }
+
+    return {
+        'primary_mood': primary_mood,
+        'confidence': round(confidence, 2),
+        'emotions': emotions,
+        'sentiment_score': sentiment_score,
+        'keywords': sorted(keywords)
+    }
+
 def simple_analytics(entries):
     """Generate simple analytics from entries"""
     if not entries:
@@ -86,47 +197,40 @@ def simple_analytics(entries):
 
     # Debug logging
     logger.info(f"📊 Processing {len(entries)} entries for analytics")
-    if entries:
-        sample_entry = entries[0]
-        logger.info(f"Sample entry: {sample_entry}")
+    sample_entry = entries[0]
+    logger.info(f"Sample entry: {sample_entry}")
+    if isinstance(sample_entry, dict):
         logger.info(f"Content type: {type(sample_entry.get('content'))}")
         logger.info(f"Content value: {repr(sample_entry.get('content'))}")
 
-    # Count moods
-    mood_counts = {}
+    # Count moods and words in one pass, skipping malformed entries
+    mood_counts = Counter()
     total_words = 0
-
     for i, entry in enumerate(entries):
         try:
-            content = entry.get('content', '')
             mood = entry.get('mood', 'neutral')
-            
-            # Ensure content is string
-            if not isinstance(content, str):
-                logger.warning(f"Entry {i}: content is {type(content)}, converting to string")
-                content = str(content) if content is not None else ''
-
-            mood_counts[mood] = mood_counts.get(mood, 0) + 1
-            
-            if content:
-                total_words += len(content.split())
-                
+            if not isinstance(mood, str):
+                raise TypeError(f"mood is {type(mood)}")
+            word_count = len(entry_text(entry).split())
         except Exception as e:
             logger.error(f"Error processing entry {i}: {e}")
             logger.error(f"Entry data: {entry}")
             continue
 
+        mood_counts[mood] += 1
+        total_words += word_count
+
     # Create emotion distribution
     total_entries = len(entries)
-    emotion_distribution = []
-    for mood, count in mood_counts.items():
-        percentage = (count / total_entries) * 100
-        emotion_distribution.append({
+    percent_per_entry = 100.0 / total_entries
+    emotion_distribution = [None] * len(mood_counts)
+    for i, (mood, count) in enumerate(mood_counts.items()):
+        emotion_distribution[i] = {
             'name': mood.title(),
-            'value': round(percentage, 1),
+            'value': round(count * percent_per_entry, 1),
             'count': count,
             'emoji': get_emotion_emoji(mood)
-        })
+        }
 
     return {
         'emotion_distribution': emotion_distribution,
@@ -136,13 +240,18 @@ def simple_analytics(entries):
         'mood_correlations': {}
     }
 
+def entry_text(entry):
+    """Get entry content as a string"""
+    content = entry.get('content', '')
+    if isinstance(content, str):
+        return content
+
+    logger.warning(f"Entry {entry.get('id', 'unknown')}: content is {type(content)}, converting to string")
+    return str(content) if content is not None else ''
+
 def get_emotion_emoji(emotion):
     """Get emoji for emotion"""
-    emoji_map = {
-        'happy': '😊', 'sad': '😢', 'angry': '😠', 'anxious': '😟',
-        'excited': '🤩', 'calm': '😌', 'neutral': '😐', 'grateful': '🙏'
-    }
-    return emoji_map.get(emotion.lower(), '😐')
+    return EMOTION_EMOJIS.get(emotion.lower(), '😐')
 
 @app.route('/generate-insights', methods=['POST'])
 def generate_insights():
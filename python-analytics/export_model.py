@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""
+Export the int8-quantized ONNX emotion model under MODEL_CACHE_DIR
+
+Run at image build time so the service only has to load the model at startup.
+"""
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from services.mood_detector import QUANTIZED_MODEL_PATH, export_quantized_model
+
+if __name__ == "__main__":
+    export_quantized_model()
+    print(f"✅ Quantized emotion model exported to {QUANTIZED_MODEL_PATH}")
@@ -1,26 +1,86 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from collections import Counter, defaultdict
+from datetime import datetime
+from collections import defaultdict
+from functools import lru_cache
+from itertools import chain
+import os
 import re
-from wordcloud import Wordcloud
-import matplotlib.pyplot as plt
-import seaborn as sns
-from textblob import TextBlob
-import plotly.graph_objects as go
-import plotly.express as px
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
+import xml.etree.ElementTree as ET
+import textblob
 import logging
-import nltk
-nltk.download('stopwords')
 
 logger = logging.getLogger(__name__)
 
+_TOKEN_RE = re.compile(r"\w{4,}")
+_SENTIMENT_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)*")
+
+# Words that flip the polarity of the next sentiment word (TextBlob uses -0.5)
+_NEGATIONS = frozenset({
+    'not', 'no', 'never', 'none', 'nothing', 'nobody', 'neither', 'nor',
+    "n't", "can't", 'cannot', "don't", "doesn't", "didn't", "isn't", "wasn't",
+    "aren't", "weren't", "won't", "wouldn't", "shouldn't", "couldn't",
+    "haven't", "hasn't", "hadn't"
+})
+
+# Number of following tokens a negation applies to
+_NEGATION_WINDOW = 3
+
+# Intensity multipliers applied to the next sentiment word
+_MODIFIERS = {
+    'very': 1.3, 'really': 1.3, 'so': 1.2, 'too': 1.2, 'extremely': 1.5,
+    'incredibly': 1.5, 'super': 1.4, 'quite': 1.1, 'pretty': 1.1,
+    'slightly': 0.7, 'somewhat': 0.8, 'barely': 0.6
+}
+
+_EMOTION_EMOJIS = {
+    'happy': '😊', 'sad': '😢', 'angry': '😠', 'anxious': '😟',
+    'excited': '🤩', 'calm': '😌', 'neutral': '😐', 'grateful': '🙏',
+    'frustrated': '😤', 'content': '😊', 'tired': '😴', 'stressed': '😰'
+}
+
+# Time-of-day names indexed by hour bucket (hours from 22 wrap to night)
+_TIME_PERIODS = np.array(['night', 'morning', 'afternoon', 'evening'])
+
+# ASCII bytes str.split() treats as whitespace: \t\n\v\f\r, \x1c-\x1f and space
+_ASCII_WHITESPACE = np.zeros(256, dtype=bool)
+_ASCII_WHITESPACE[[9, 10, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+
+# Sentiment score cut points, lowest label first
+_SENTIMENT_BINS = [-0.6, -0.2, 0.2, 0.6]
+_SENTIMENT_LABELS = np.array(['Very Negative', 'Negative', 'Neutral', 'Positive', 'Very Positive'])
+
+def _wall_clock_time(value):
+    """A timestamp's local wall-clock time without its UTC offset, or NaT"""
+    try:
+        return pd.Timestamp(value).tz_localize(None)
+    except (ValueError, TypeError):
+        return pd.NaT
+
+def _to_local_datetimes(values):
+    """Parse timestamps to naive local wall-clock times, NaT where unparsable"""
+    try:
+        parsed = pd.to_datetime(values, errors='coerce')
+    except (ValueError, TypeError):
+        parsed = None
+    
+    # Mixed UTC offsets can't share one dtype, so parse those values one by one
+    if parsed is None or not pd.api.types.is_datetime64_any_dtype(parsed):
+        return pd.to_datetime(values.map(_wall_clock_time))
+    return parsed.dt.tz_localize(None) if parsed.dt.tz is not None else parsed
+
+@lru_cache(maxsize=1)
+def _load_stop_words():
+    """Load the bundled English stop word list (NLTK's list, shipped with the service)"""
+    path = os.path.join(os.path.dirname(__file__), 'stopwords_en.txt')
+    with open(path, encoding='utf-8') as f:
+        return frozenset(f.read().split())
+
 class AnalyticsEngine:
     def __init__(self):
-      self.stop_words = set(nltk.corpus.stopwords.words('english'))
-  
+        self.stop_words = _load_stop_words()
+        self._polarity_lexicon = self._load_polarity_lexicon()
+
     def initialize_models(self):
         """Initialize any ML models needed for analytics"""
         logger.info("Analytics engine models initialized")
@@ -28,18 +88,18 @@ class AnalyticsEngine:
     def generate_comprehensive_insights(self, entries):
         """Generate comprehensive insights from journal entries"""
         try:
-            # Convert entries to DataFrame for easier analysis
-            df = self._entries_to_dataframe(entries)
+            # Convert entries to DataFrame once and share it across analyses
+            df = self._prepare_dataframe(entries)
             
             if df.empty:
                 return self._empty_insights()
             
             insights = {
-                'emotion_distribution': self.analyze_emotion_distribution(entries),
-                'sentiment_analysis': self.analyze_sentiment_over_time(entries),
+                'emotion_distribution': self.analyze_emotion_distribution(entries, df),
+                'sentiment_analysis': self.analyze_sentiment_over_time(entries, df),
                 'word_cloud': self.generate_word_cloud_data(entries),
-                'writing_patterns': self.analyze_writing_patterns(entries),
-                'mood_correlations': self.analyze_mood_correlations(entries),
+                'writing_patterns': self.analyze_writing_patterns(entries, df),
+                'mood_correlations': self.analyze_mood_correlations(entries, df),
                 'advanced_analytics': self._generate_advanced_analytics(df),
                 'ai_insights': self._generate_ai_insights(df)
             }
@@ -50,10 +110,11 @@ class AnalyticsEngine:
             logger.error(f"Error generating comprehensive insights: {e}")
             return self._empty_insights()
     
-    def analyze_emotion_distribution(self, entries):
+    def analyze_emotion_distribution(self, entries, df=None):
         """Analyze emotion distribution with advanced statistics"""
         try:
-            df = self._entries_to_dataframe(entries)
+            if df is None:
+                df = self._prepare_dataframe(entries)
             
             if df.empty or 'mood' not in df.columns:
                 return []
@@ -61,6 +122,7 @@ class AnalyticsEngine:
             # Count emotions
             emotion_counts = df['mood'].value_counts()
             total_entries = len(df)
+            emotion_trends = self._calculate_emotion_trends(df)
             
             # Calculate statistics
             distribution = []
@@ -72,7 +134,7 @@ class AnalyticsEngine:
                     'value': round(percentage, 1),
                     'count': int(count),
                     'emoji': self._get_emotion_emoji(emotion),
-                    'trend': self._calculate_emotion_trend(df, emotion)
+                    'trend': emotion_trends.get(emotion, 'stable')
                 })
             
             # Sort by percentage
@@ -84,36 +146,34 @@ class AnalyticsEngine:
             logger.error(f"Error analyzing emotion distribution: {e}")
             return []
     
-    def analyze_sentiment_over_time(self, entries):
+    def analyze_sentiment_over_time(self, entries, df=None):
         """Advanced sentiment analysis over time"""
         try:
-            df = self._entries_to_dataframe(entries)
+            if df is None:
+                df = self._prepare_dataframe(entries)
             
             if df.empty:
                 return {'distribution': [], 'over_time': []}
             
             # Calculate sentiment scores for each entry
-            sentiment_scores = []
-            for _, row in df.iterrows():
-                blob = TextBlob(row['content'])
-                sentiment_scores.append(blob.sentiment.polarity)
-            
-            df['sentiment_score'] = sentiment_scores
+            df['sentiment_score'] = self._fast_polarities(df['content'].tolist())
+            sentiment_scores = df['sentiment_score'].to_numpy()
             
             # Create sentiment distribution
             distribution = self._create_sentiment_distribution(sentiment_scores)
             
             # Create time series data
-            df['date'] = pd.to_datetime(df['created_at']).dt.date
             daily_sentiment = df.groupby('date')['sentiment_score'].mean().reset_index()
             
-            over_time = []
-            for _, row in daily_sentiment.iterrows():
-                over_time.append({
-                    'date': row['date'].isoformat(),
-                    'score': round(row['sentiment_score'], 3),
-                    'label': self._sentiment_label(row['sentiment_score'])
-                })
+            daily_scores = daily_sentiment['sentiment_score'].to_numpy()
+            dates = daily_sentiment['date'].astype(str).tolist()
+            scores = daily_scores.round(3).tolist()
+            labels = _SENTIMENT_LABELS[np.digitize(daily_scores, _SENTIMENT_BINS)].tolist()
+            
+            over_time = [
+                {'date': date, 'score': score, 'label': label}
+                for date, score, label in zip(dates, scores, labels)
+            ]
             
             return {
                 'distribution': distribution,
@@ -129,23 +189,21 @@ class AnalyticsEngine:
     def generate_word_cloud_data(self, entries):
         """Generate advanced word cloud data with sentiment analysis"""
         try:
-            # Combine all text
-            all_text = ' '.join([entry.get('content', '') for entry in entries])
-                
-            # Clean and tokenize
-            words = self._extract_meaningful_words(all_text)
-            
-            # Count word frequencies
-            word_freq = Counter(words)
+            # Tokenize, filter and count, keeping the top words
+            top_words = self._top_meaningful_words(entries, 50)
             
-            # Get top words
-            top_words = word_freq.most_common(50)
+            # Score every sentence holding a top word in one batch, then reduce per word
+            sentiment_sums, sentence_counts, word_contexts = self._score_word_sentences(
+                [word for word, _ in top_words], entries
+            )
             
             # Analyze sentiment for each word
             word_data = []
-            for word, frequency in top_words:
+            for i, (word, frequency) in enumerate(top_words):
                 # Analyze sentiment of sentences containing this word
-                sentiment = self._analyze_word_sentiment(word, entries)
+                sentiment = self._analyze_word_sentiment(
+                    sentiment_sums[i], sentence_counts[i], word_contexts[i]
+                )
                 
                 word_data.append({
                     'text': word,
@@ -154,7 +212,7 @@ class AnalyticsEngine:
                     'sentiment': sentiment['category'],
                     'sentiment_score': sentiment['score'],
                     'color': self._get_sentiment_color(sentiment['score']),
-                    'contexts': sentiment['contexts'][:3]  # Top 3 contexts
+                    'contexts': sentiment['contexts']
                 })
             
             return word_data
@@ -163,23 +221,15 @@ class AnalyticsEngine:
             logger.error(f"Error generating word cloud: {e}")
             return []
     
-    def analyze_writing_patterns(self, entries):
+    def analyze_writing_patterns(self, entries, df=None):
         """Comprehensive writing pattern analysis"""
         try:
-            df = self._entries_to_dataframe(entries)
+            if df is None:
+                df = self._prepare_dataframe(entries)
             
             if df.empty:
                 return {}
             
-            # Convert timestamps
-            df['datetime'] = pd.to_datetime(df['created_at'])
-            df['hour'] = df['datetime'].dt.hour
-            df['day_of_week'] = df['datetime'].dt.day_name()
-            df['date'] = df['datetime'].dt.date
-            
-            # Calculate word counts
-            df['word_count'] = df['content'].apply(lambda x: len(x.split()))
-            
             # Time analysis
             time_distribution = self._analyze_time_patterns(df)
             
@@ -219,32 +269,34 @@ class AnalyticsEngine:
             logger.error(f"Error analyzing writing patterns: {e}")
             return {}
     
-    def analyze_mood_correlations(self, entries):
+    def analyze_mood_correlations(self, entries, df=None):
         """Advanced mood correlation analysis"""
         try:
-            df = self._entries_to_dataframe(entries)
+            if df is None:
+                df = self._prepare_dataframe(entries)
             
             if df.empty:
                 return {}
             
-            # Mood-tag correlations
-            mood_tag_correlations = self._analyze_mood_tag_correlations(df)
-            
-            # Mood-length correlations
-            mood_length_correlations = self._analyze_mood_length_correlations(df)
+            # One correlation matrix covers every mood/factor pair
+            corr = self._correlation_matrix(df)
+            moods = [name for name in corr.index if name.startswith('mood_')]
             
-            # Time-mood correlations
-            time_mood_correlations = self._analyze_time_mood_correlations(df)
-            
-            # Weather-mood correlations (if weather data available)
-            weather_correlations = self._analyze_weather_correlations(df)
+            mood_length_correlations = corr.loc[moods, 'word_count'].fillna(0.0).round(3)
             
             return {
-                'mood_tag_correlations': mood_tag_correlations,
-                'mood_length_correlations': mood_length_correlations,
-                'time_mood_correlations': time_mood_correlations,
-                'weather_correlations': weather_correlations,
-                'correlation_insights': self._generate_correlation_insights(df)
+                'mood_tag_correlations': self._correlation_block(corr, moods, 'tag_'),
+                'mood_length_correlations': {
+                    mood[len('mood_'):]: value
+                    for mood, value in zip(moods, mood_length_correlations.tolist())
+                },
+                'time_mood_correlations': {
+                    'time_of_day': self._correlation_block(corr, moods, 'time_'),
+                    'day_of_week': self._correlation_block(corr, moods, 'day_')
+                },
+                # Entries carry no weather data yet
+                'weather_correlations': {},
+                'correlation_insights': self._generate_correlation_insights(corr, moods)
             }
             
         except Exception as e:
@@ -269,40 +321,219 @@ class AnalyticsEngine:
         
         return pd.DataFrame(data)
     
+    def _load_polarity_lexicon(self):
+        """Load TextBlob's sentiment lexicon once, averaging polarity across senses"""
+        path = os.path.join(os.path.dirname(textblob.__file__), 'en', 'en-sentiment.xml')
+        senses = defaultdict(list)
+        for word in ET.parse(path).getroot().iter('word'):
+            form = word.get('form', '').lower()
+            if form:
+                senses[form].append(float(word.get('polarity', 0.0)))
+
+        return {form: sum(values) / len(values) for form, values in senses.items()}
+
+    def _fast_polarity(self, text):
+        """Polarity in [-1, 1] from a single lexicon pass over the text"""
+        if not text:
+            return 0.0
+
+        total = 0.0
+        matched = 0
+        negation_window = 0
+        modifier = 1.0
+
+        for token in _SENTIMENT_TOKEN_RE.findall(text.lower()):
+            if token in _NEGATIONS:
+                negation_window = _NEGATION_WINDOW
+                continue
+
+            # A negation only reaches the next few tokens ("not at all happy")
+            negate = negation_window > 0
+            negation_window -= 1
+
+            if token in _MODIFIERS:
+                modifier = _MODIFIERS[token]
+                continue
+
+            # A modifier only applies to the word right after it ("so good")
+            polarity = self._polarity_lexicon.get(token)
+            if polarity is None:
+                modifier = 1.0
+                continue
+
+            if negate:
+                polarity *= -0.5
+            total += modifier * polarity
+            matched += 1
+            negation_window = 0
+            modifier = 1.0
+
+        if not matched:
+            return 0.0
+        return max(-1.0, min(1.0, total / matched))
+
+    def _prepare_dataframe(self, entries):
+        """Build the entries DataFrame with the derived columns every analysis shares"""
+        df = self._entries_to_dataframe(entries)
+        
+        if df.empty:
+            return df
+        
+        # Calendar fields come from each entry's local time; unparsable
+        # timestamps become NaT and are left out of date-based analyses only
+        df['datetime'] = _to_local_datetimes(df['created_at'])
+        df['date'] = df['datetime'].dt.normalize()
+        df['hour'] = df['datetime'].dt.hour
+        df['day_of_week'] = df['datetime'].dt.day_name()
+        df['word_count'] = self._count_words(df['content'].astype(str).tolist())
+        
+        return df
+    
+    def _count_words(self, texts):
+        """Count words per text as len(text.split()) would
+
+        ASCII texts are counted with one scan over a shared byte buffer; texts
+        with non-ASCII characters, which may hold Unicode whitespace, fall back
+        to str.split().
+        """
+        encoded = [text.encode('utf-8') for text in texts]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        
+        # Texts are joined with a newline so no word can straddle two entries
+        starts = np.zeros(len(encoded), dtype=np.int64)
+        starts[1:] = np.cumsum(lengths[:-1] + 1)
+        buf = np.frombuffer(b'\n'.join(encoded), dtype=np.uint8)
+        
+        # A word starts wherever a non-whitespace byte follows whitespace
+        in_word = ~_ASCII_WHITESPACE[buf]
+        word_starts = in_word.copy()
+        word_starts[1:] &= ~in_word[:-1]
+        
+        totals = np.zeros(buf.size + 1, dtype=np.int64)
+        np.cumsum(word_starts, out=totals[1:])
+        counts = (totals[starts + lengths] - totals[starts]).astype(np.int32)
+
+        for i, text in enumerate(texts):
+            if not text.isascii():
+                counts[i] = len(text.split())
+        return counts
+    
+    def _fast_polarities(self, texts):
+        """Lexicon polarity for a batch of texts as a float array"""
+        return np.fromiter(map(self._fast_polarity, texts), dtype=np.float64, count=len(texts))
+
+    def _correlation_matrix(self, df):
+        """Correlate one-hot moods with tags, time of day, weekday and entry length"""
+        hours = df['hour']
+        periods = pd.Series(
+            _TIME_PERIODS[np.searchsorted([6, 12, 18, 22], hours.to_numpy(), side='right') % 4],
+            index=df.index
+        ).where(hours.notna())
+        
+        tags = df['tags'].explode().dropna()
+        if tags.empty:
+            tag_columns = pd.DataFrame(index=df.index)
+        else:
+            tag_columns = pd.crosstab(tags.index, tags).clip(upper=1).reindex(df.index, fill_value=0)
+        
+        features = pd.concat([
+            pd.get_dummies(df['mood'], prefix='mood', dtype=float),
+            tag_columns.add_prefix('tag_').astype(float),
+            pd.get_dummies(periods, prefix='time', dtype=float),
+            pd.get_dummies(df['day_of_week'], prefix='day', dtype=float),
+            df[['word_count']].astype(float)
+        ], axis=1)
+        
+        return features.corr()
+    
+    def _correlation_block(self, corr, moods, prefix):
+        """Slice mood rows against the factor columns sharing a prefix"""
+        factors = [name for name in corr.columns if name.startswith(prefix)]
+        block = corr.loc[moods, factors].fillna(0.0).round(3).to_numpy().tolist()
+        
+        return {
+            mood[len('mood_'):]: {
+                factor[len(prefix):]: value for factor, value in zip(factors, values)
+            }
+            for mood, values in zip(moods, block)
+        }
+    
+    def _generate_correlation_insights(self, corr, moods, limit=5):
+        """List the strongest mood/factor correlations"""
+        factors = [name for name in corr.columns if not name.startswith('mood_')]
+        pairs = corr.loc[moods, factors].stack().dropna()
+        strongest = pairs[pairs.abs() >= 0.3].abs().sort_values(ascending=False).index[:limit]
+        
+        return [
+            {
+                'mood': mood[len('mood_'):],
+                'factor': factor,
+                'correlation': round(float(pairs[(mood, factor)]), 3)
+            }
+            for mood, factor in strongest
+        ]
+    
     def _extract_meaningful_words(self, text):
         """Extract meaningful words from text"""
-        # Convert to lowercase and remove punctuation
-        text = re.sub(r'[^\w\s]', ' ', text.lower())
+        # Runs of 4+ word characters, i.e. punctuation-split words longer than 3
+        return [word for word in _TOKEN_RE.findall(text.lower()) if word not in self.stop_words]
+    
+    def _top_meaningful_words(self, entries, limit):
+        """Return the most frequent meaningful words as (word, count) pairs"""
+        contents = (entry.get('content', '') for entry in entries)
+        words = chain.from_iterable(map(self._extract_meaningful_words, contents))
         
-        # Split into words
-        words = text.split()
+        # Dictionary-encode words so counting happens on int ids in C
+        vocab = {}
+        ids = np.fromiter((vocab.setdefault(word, len(vocab)) for word in words), dtype=np.int32)
+        if not vocab:
+            return []
+        counts = np.bincount(ids, minlength=len(vocab))
         
-        # Filter out stop words and short words
-        meaningful_words = [
-            word for word in words 
-            if len(word) > 3 and word not in self.stop_words
-        ]
+        # Ids are assigned in first-seen order, so a stable sort keeps ties in
+        # first-seen order and picks the same words as Counter.most_common
+        top = np.argsort(-counts, kind="stable")[:limit]
         
-        return meaningful_words
-    
-    def _analyze_word_sentiment(self, word, entries):
-        """Analyze sentiment of a specific word in context"""
-        contexts = []
-        sentiment_scores = []
+        words_by_id = list(vocab)
+        return [(words_by_id[i], int(counts[i])) for i in top]
+
+    def _score_word_sentences(self, words, entries, max_contexts=3):
+        """Sum sentence polarity per word over the sentences containing it"""
+        word_ids = {word: i for i, word in enumerate(words)}
+        contexts = [[] for _ in words]
+        sentences = []
+        hit_words = []
+        hit_sentences = []
         
         for entry in entries:
-            content = entry.get('content', '').lower()
-            if word in content:
-                # Find sentences containing the word
-                sentences = content.split('.')
-                for sentence in sentences:
-                    if word in sentence:
-                        blob = TextBlob(sentence)
-                        sentiment_scores.append(blob.sentiment.polarity)
-                        contexts.append(sentence.strip())
+            for sentence in entry.get('content', '').lower().split('.'):
+                ids = {word_ids[word] for word in self._extract_meaningful_words(sentence) if word in word_ids}
+                if not ids:
+                    continue
+                
+                context = sentence.strip()
+                for i in ids:
+                    hit_words.append(i)
+                    hit_sentences.append(len(sentences))
+                    if len(contexts[i]) < max_contexts:
+                        contexts[i].append(context)
+                sentences.append(sentence)
         
-        if sentiment_scores:
-            avg_sentiment = np.mean(sentiment_scores)
+        # Each sentence is scored once, however many tracked words it holds
+        polarities = self._fast_polarities(sentences)
+        hit_words = np.asarray(hit_words, dtype=np.intp)
+        
+        sums = np.zeros(len(words))
+        counts = np.zeros(len(words), dtype=np.int64)
+        np.add.at(sums, hit_words, polarities[np.asarray(hit_sentences, dtype=np.intp)])
+        np.add.at(counts, hit_words, 1)
+        
+        return sums, counts, contexts
+
+    def _analyze_word_sentiment(self, sentiment_sum, sentence_count, contexts):
+        """Analyze sentiment of a word from the sentences it appears in"""
+        if sentence_count:
+            avg_sentiment = float(sentiment_sum / sentence_count)
             category = 'positive' if avg_sentiment > 0.1 else 'negative' if avg_sentiment < -0.1 else 'neutral'
         else:
             avg_sentiment = 0
@@ -325,12 +556,7 @@ class AnalyticsEngine:
     
     def _get_emotion_emoji(self, emotion):
         """Get emoji for emotion"""
-        emoji_map = {
-            'happy': '😊', 'sad': '😢', 'angry': '😠', 'anxious': '😟',
-            'excited': '🤩', 'calm': '😌', 'neutral': '😐', 'grateful': '🙏',
-            'frustrated': '😤', 'content': '😊', 'tired': '😴', 'stressed': '😰'
-        }
-        return emoji_map.get(emotion.lower(), '😐')
+        return _EMOTION_EMOJIS.get(emotion.lower(), '😐')
     
     def _empty_insights(self):
         """Return empty insights structure"""
@@ -344,27 +570,25 @@ class AnalyticsEngine:
             'ai_insights': {}
         }
 
-    def _calculate_emotion_trend(self, df, emotion):
-        """Calculate trend for specific emotion"""
+    def _calculate_emotion_trends(self, df):
+        """Calculate the trend of every emotion with a single groupby"""
         try:
-            df['date'] = pd.to_datetime(df['created_at']).dt.date
-            emotion_by_date = df[df['mood'] == emotion].groupby('date').size()
-
-            if len(emotion_by_date) < 2:
-                return 'stable'
+            # Entries per (emotion, date), only for dates the emotion appears on
+            by_date = df.groupby(['mood', 'date']).size().groupby(level='mood')
 
             # Simple trend calculation
-            recent_avg = emotion_by_date.tail(3).mean()
-            older_avg = emotion_by_date.head(3).mean()
+            recent_avg = by_date.tail(3).groupby(level='mood').mean()
+            older_avg = by_date.head(3).groupby(level='mood').mean()
+            active_days = by_date.size()
 
-            if recent_avg > older_avg * 1.2:
-                return 'increasing'
-            elif recent_avg < older_avg * 0.8:
-                return 'decreasing'
-            else:
-                return 'stable'
+            trends = np.where(
+                active_days < 2, 'stable',
+                np.where(recent_avg > older_avg * 1.2, 'increasing',
+                         np.where(recent_avg < older_avg * 0.8, 'decreasing', 'stable'))
+            )
+            return dict(zip(active_days.index, trends.tolist()))
         except:
-            return 'stable'
+            return {}
 
     def _create_sentiment_distribution(self, sentiment_scores):
         """Create sentiment distribution data"""
@@ -376,130 +600,87 @@ class AnalyticsEngine:
             {'sentiment': 'Very Negative', 'value': 0, 'color': '#EF4444'}
         ]
 
-        for score in sentiment_scores:
-            if score >= 0.6:
-                distribution[0]['value'] += 1
-            elif score >= 0.2:
-                distribution[1]['value'] += 1
-            elif score >= -0.2:
-                distribution[2]['value'] += 1
-            elif score >= -0.6:
-                distribution[3]['value'] += 1
-            else:
-                distribution[4]['value'] += 1
+        # Bucket counts come out lowest first; the distribution lists highest first
+        counts = np.bincount(np.digitize(sentiment_scores, _SENTIMENT_BINS), minlength=5)[::-1]
 
         total = len(sentiment_scores)
-        for item in distribution:
-            item['value'] = round((item['value'] / total) * 100, 1) if total > 0 else 0
+        for item, count in zip(distribution, counts.tolist()):
+            item['value'] = round((count / total) * 100, 1) if total > 0 else 0
 
         return distribution
 
-    def _sentiment_label(self, score):
-        """Get sentiment label from score"""
-        if score >= 0.6:
-            return 'Very Positive'
-        elif score >= 0.2:
-            return 'Positive'
-        elif score >= -0.2:
-            return 'Neutral'
-        elif score >= -0.6:
-            return 'Negative'
-        else:
-            return 'Very Negative'
-
     def _analyze_time_patterns(self, df):
         """Analyze writing time patterns"""
-        time_dist = {'morning': 0, 'afternoon': 0, 'evening': 0, 'night': 0}
-
-        for hour in df['hour']:
-            if 6 <= hour < 12:
-                time_dist['morning'] += 1
-            elif 12 <= hour < 18:
-                time_dist['afternoon'] += 1
-            elif 18 <= hour < 22:
-                time_dist['evening'] += 1
-            else:
-                time_dist['night'] += 1
+        # 0 night, 1 morning, 2 afternoon, 3 evening; hours from 22 wrap back to night
+        buckets = np.searchsorted([6, 12, 18, 22], df['hour'].dropna().to_numpy(), side='right') % 4
+        counts = np.bincount(buckets, minlength=4)[[1, 2, 3, 0]]
 
-        total = len(df)
-        return [
-            {
-                'time': time.title(),
-                'count': count,
-                'percentage': round((count / total) * 100, 1) if total > 0 else 0
-            }
-            for time, count in time_dist.items()
-        ]
+        return self._bucket_distribution('time', ['Morning', 'Afternoon', 'Evening', 'Night'], counts)
 
     def _analyze_length_patterns(self, df):
         """Analyze entry length patterns"""
-        length_dist = {'0-100': 0, '100-300': 0, '300-500': 0, '500+': 0}
-
-        for word_count in df['word_count']:
-            if word_count <= 100:
-                length_dist['0-100'] += 1
-            elif word_count <= 300:
-                length_dist['100-300'] += 1
-            elif word_count <= 500:
-                length_dist['300-500'] += 1
-            else:
-                length_dist['500+'] += 1
+        buckets = np.searchsorted([101, 301, 501], df['word_count'].to_numpy(), side='right')
+        counts = np.bincount(buckets, minlength=4)
+
+        labels = ['0-100 words', '100-300 words', '300-500 words', '500+ words']
+        return self._bucket_distribution('range', labels, counts)
+
+    def _bucket_distribution(self, key, labels, counts):
+        """Build count/percentage rows for bucketed counts"""
+        total = counts.sum()
+        percentages = (counts * 100 / total).round(1) if total > 0 else np.zeros(len(counts))
 
-        total = len(df)
         return [
-            {
-                'range': f"{range_key} words",
-                'count': count,
-                'percentage': round((count / total) * 100, 1) if total > 0 else 0
-            }
-            for range_key, count in length_dist.items()
+            {key: label, 'count': count, 'percentage': percentage}
+            for label, count, percentage in zip(labels, counts.tolist(), percentages.tolist())
         ]
 
     def _calculate_writing_streak(self, df):
         """Calculate current writing streak"""
         try:
-            df['date'] = pd.to_datetime(df['created_at']).dt.date
-            unique_dates = sorted(df['date'].unique(), reverse=True)
+            # Sorted unique day numbers, newest first
+            days = df['date'].dropna().values.astype('datetime64[D]').view(np.int64)
+            days_desc = np.unique(days)[::-1]
 
-            if not unique_dates:
+            if days_desc.size == 0:
                 return 0
 
-            streak = 1
-            current_date = unique_dates[0]
-
-            for i in range(1, len(unique_dates)):
-                expected_date = current_date - timedelta(days=i)
-                if unique_dates[i] == expected_date:
-                    streak += 1
-                else:
-                    break
-
-            return streak
+            # The streak ends at the first day that is not exactly i days before the latest
+            gaps = np.flatnonzero(days_desc != days_desc[0] - np.arange(days_desc.size))
+            return int(gaps[0]) if gaps.size else int(days_desc.size)
         except:
             return 0
 
     def _analyze_productivity(self, df):
         """Analyze writing productivity"""
         try:
-            df['date'] = pd.to_datetime(df['created_at']).dt.date
-            daily_stats = df.groupby('date').agg({
-                'word_count': ['sum', 'count', 'mean']
-            }).round(1)
+            # Sort by day number and reduce word counts over each run of equal days
+            dated = df[df['date'].notna()]
+            days = dated['date'].values.astype('datetime64[D]').view(np.int64)
+            order = np.argsort(days, kind='stable')
+            days_sorted = days[order]
+            words_sorted = dated['word_count'].to_numpy(dtype=np.int64)[order]
+
+            starts = np.r_[0, np.flatnonzero(np.diff(days_sorted)) + 1]
+            daily_words = np.add.reduceat(words_sorted, starts)
+            daily_entries = np.diff(np.r_[starts, days_sorted.size])
+
+            most_productive = np.datetime64(int(days_sorted[starts[daily_words.argmax()]]), 'D')
 
             return {
-                'most_productive_day': daily_stats['word_count']['sum'].idxmax().isoformat(),
-                'average_daily_words': round(daily_stats['word_count']['sum'].mean(), 1),
-                'average_entries_per_day': round(daily_stats['word_count']['count'].mean(), 1),
-                'productivity_trend': self._calculate_productivity_trend(daily_stats)
+                'most_productive_day': str(most_productive),
+                'average_daily_words': round(float(daily_words.mean()), 1),
+                'average_entries_per_day': round(float(daily_entries.mean()), 1),
+                'productivity_trend': self._calculate_productivity_trend(daily_words)
             }
         except:
             return {}
 
-    def _calculate_productivity_trend(self, daily_stats):
+    def _calculate_productivity_trend(self, daily_words):
         """Calculate productivity trend"""
         try:
-            recent_avg = daily_stats['word_count']['sum'].tail(7).mean()
-            older_avg = daily_stats['word_count']['sum'].head(7).mean()
+            recent_avg = daily_words[-7:].mean()
+            older_avg = daily_words[:7].mean()
 
             if recent_avg > older_avg * 1.1:
                 return 'increasing'
@@ -2,11 +2,115 @@ import os
 import json
 import firebase_admin
 from firebase_admin import credentials, firestore
-from .mood_detector import MoodDetector
+from .mood_detector import MoodDetector, quantized_model_available
 import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
 
 logger = logging.getLogger(__name__)
 
+# Firestore rejects write batches with more than 500 operations
+BATCH_WRITE_LIMIT = 500
+
+# Process-wide Firestore client and mood detector, shared by every FirebaseService
+_DB = None
+_MOOD_DETECTOR = None
+_INIT_LOCK = threading.RLock()
+_INITIALIZED = False
+
+def get_mood_detector():
+    """Get the process-wide mood detector, loading its models on first use"""
+    global _MOOD_DETECTOR
+    
+    with _INIT_LOCK:
+        if _MOOD_DETECTOR is None:
+            mood_detector = MoodDetector()
+            mood_detector.initialize_models()
+            _MOOD_DETECTOR = mood_detector
+    
+    return _MOOD_DETECTOR
+
+def preload_mood_detector():
+    """Load the shared mood detector before worker processes are forked
+    
+    Run in the master process (e.g. gunicorn --preload) so workers inherit the
+    loaded model through copy-on-write pages instead of each loading a copy.
+    Skipped when the quantized ONNX model is in use: an ONNX Runtime session and
+    its thread pools are not fork-safe, so each worker creates its own on first use.
+    """
+    if quantized_model_available():
+        logger.info("Quantized ONNX emotion model in use, leaving model loading to workers")
+        return None
+    
+    mood_detector = get_mood_detector()
+    
+    # Keep PyTorch weights in shared memory so workers don't copy them on write
+    model = getattr(mood_detector.emotion_classifier, 'model', None)
+    if hasattr(model, 'share_memory'):
+        model.share_memory()
+    
+    logger.info("Mood detection models preloaded")
+    return mood_detector
+
+@lru_cache(maxsize=1)
+def _service_account_info():
+    """Parse the service account JSON from the environment once per process"""
+    service_account_key = os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY')
+    return json.loads(service_account_key) if service_account_key else None
+
+# How long saved analytics stay valid in the analytics_cache collection
+ANALYTICS_CACHE_TTL = timedelta(hours=1)
+
+# In-process LRU of analytics insights in front of the analytics_cache collection
+ANALYTICS_L1_MAXSIZE = 1024
+ANALYTICS_L1_TTL_SECONDS = 300
+_ANALYTICS_L1 = OrderedDict()
+_ANALYTICS_L1_LOCK = threading.Lock()
+
+# Analytics request logs are queued and written in batches by a daemon thread
+LOG_FLUSH_INTERVAL_SECONDS = 5
+_LOG_QUEUE = queue.Queue()
+_LOG_WRITER = None
+_LOG_WRITER_LOCK = threading.Lock()
+
+def _drain_logs():
+    """Write queued analytics logs in batches of up to BATCH_WRITE_LIMIT"""
+    while True:
+        log_rows = [_LOG_QUEUE.get()]
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL_SECONDS
+        
+        # Keep collecting until the batch is full or the flush interval passes
+        while len(log_rows) < BATCH_WRITE_LIMIT:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                log_rows.append(_LOG_QUEUE.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        try:
+            log_ref = _DB.collection('analytics_logs')
+            batch = _DB.batch()
+            for log_data in log_rows:
+                batch.set(log_ref.document(), log_data)
+            batch.commit()
+        except Exception as e:
+            logger.error(f"Error writing {len(log_rows)} analytics logs: {e}")
+
+def _start_log_writer():
+    """Start the background log writer once per process"""
+    global _LOG_WRITER
+    
+    with _LOG_WRITER_LOCK:
+        if _LOG_WRITER is None:
+            _LOG_WRITER = threading.Thread(target=_drain_logs, name='analytics-log-writer', daemon=True)
+            _LOG_WRITER.start()
+
 class FirebaseService:
     def __init__(self):
         self.db = None
@@ -14,134 +118,338 @@ class FirebaseService:
         self._initialize_firebase()
     
     def _initialize_firebase(self):
-        """Initialize Firebase connection"""
+        """Initialize Firebase connection
+        
+        The Firestore client and mood detector are created once per process and
+        reused, so new instances don't reload the emotion model.
+        """
+        global _DB, _INITIALIZED
+        
+        # Already set up by an earlier instance: skip the lock and credential lookup
+        if _INITIALIZED:
+            self.db = _DB
+            self.mood_detector = _MOOD_DETECTOR
+            return
+        
         try:
-            # Check if Firebase is already initialized
-            if not firebase_admin._apps:
-                # Initialize Firebase Admin SDK
-                if os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY'):
-                    # Use service account key from environment
-                    service_account_info = json.loads(os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY'))
-                    cred = credentials.Certificate(service_account_info)
-                elif os.path.exists('firebase-service-account.json'):
-                    # Use service account key file
-                    cred = credentials.Certificate('firebase-service-account.json')
-                else:
-                    # Use default credentials (for Google Cloud environments)
-                    cred = credentials.ApplicationDefault()
+            with _INIT_LOCK:
+                if _DB is None:
+                    # Check if Firebase is already initialized
+                    if not firebase_admin._apps:
+                        # Initialize Firebase Admin SDK
+                        service_account_info = _service_account_info()
+                        if service_account_info:
+                            # Use service account key from environment
+                            cred = credentials.Certificate(service_account_info)
+                        elif os.path.exists('firebase-service-account.json'):
+                            # Use service account key file
+                            cred = credentials.Certificate('firebase-service-account.json')
+                        else:
+                            # Use default credentials (for Google Cloud environments)
+                            cred = credentials.ApplicationDefault()
+                        
+                        firebase_admin.initialize_app(cred)
+                    
+                    _DB = firestore.client()
                 
-                firebase_admin.initialize_app(cred)
-            
-            self.db = firestore.client()
-            self.mood_detector = MoodDetector()
-            self.mood_detector.initialize_models()
+                get_mood_detector()
+                _INITIALIZED = True
+                
+                logger.info("Firebase service initialized successfully")
             
-            logger.info("Firebase service initialized successfully")
+            self.db = _DB
+            self.mood_detector = _MOOD_DETECTOR
             
         except Exception as e:
             logger.error(f"Error initializing Firebase: {e}")
             self.db = None
     
+    def iter_user_entries(self, user_id):
+        """Yield a user's journal entries, newest first, as Firestore streams them"""
+        if not self.db:
+            raise Exception("Firebase not initialized")
+        
+        entries_ref = self.db.collection('journal_entries')
+        query = entries_ref.where('userId', '==', user_id).order_by('createdAt', direction=firestore.Query.DESCENDING)
+        
+        yield from self._iter_entries(query)
+    
+    def iter_user_entry_pages(self, user_id, page_size=BATCH_WRITE_LIMIT):
+        """Yield a user's journal entries, newest first, in pages of up to page_size
+        
+        Each page is a separate query resuming after the previous page's last
+        document, so no stream is held open while a page is being processed.
+        """
+        if not self.db:
+            raise Exception("Firebase not initialized")
+        
+        entries_ref = self.db.collection('journal_entries')
+        query = (entries_ref
+                 .where('userId', '==', user_id)
+                 .order_by('createdAt', direction=firestore.Query.DESCENDING)
+                 .limit(page_size))
+        
+        last_doc = None
+        while True:
+            page_query = query.start_after(last_doc) if last_doc else query
+            docs = list(page_query.stream())
+            if not docs:
+                break
+            
+            page = []
+            for doc in docs:
+                entry_data = doc.to_dict()
+                entry_data['id'] = doc.id
+                page.append(entry_data)
+            yield page
+            
+            if len(docs) < page_size:
+                break
+            last_doc = docs[-1]
+    
+    def _iter_entries(self, query):
+        """Yield entry dicts with their document ids from a streamed query"""
+        for doc in query.stream():
+            entry_data = doc.to_dict()
+            entry_data['id'] = doc.id
+            yield entry_data
+    
     def get_user_entries(self, user_id):
         """Get all journal entries for a user"""
+        try:
+            entries = list(self.iter_user_entries(user_id))
+            logger.info(f"Retrieved {len(entries)} entries for user {user_id}")
+            return entries
+            
+        except Exception as e:
+            logger.error(f"Error getting user entries: {e}")
+            return []
+    
+    def get_entries_by_ids(self, entry_ids):
+        """Get specific journal entries in one batched read
+        
+        Entries that no longer exist are left out.
+        """
         try:
             if not self.db:
                 raise Exception("Firebase not initialized")
             
             entries_ref = self.db.collection('journal_entries')
-            query = entries_ref.where('userId', '==', user_id).order_by('createdAt', direction=firestore.Query.DESCENDING)
+            doc_refs = [entries_ref.document(entry_id) for entry_id in entry_ids]
             
             entries = []
-            for doc in query.stream():
+            for doc in self.db.get_all(doc_refs):
+                if not doc.exists:
+                    continue
                 entry_data = doc.to_dict()
                 entry_data['id'] = doc.id
                 entries.append(entry_data)
             
-            logger.info(f"Retrieved {len(entries)} entries for user {user_id}")
+            logger.info(f"Retrieved {len(entries)} of {len(doc_refs)} requested entries")
             return entries
             
         except Exception as e:
-            logger.error(f"Error getting user entries: {e}")
+            logger.error(f"Error getting entries by id: {e}")
             return []
     
-    def update_entry_mood(self, entry_id, mood_data):
-        """Update an entry with detected mood"""
+    def redetect_entry_moods(self, entry_ids):
+        """Re-run mood detection for specific entries, whatever their current state"""
         try:
-            if not self.db:
-                raise Exception("Firebase not initialized")
+            entries = self.get_entries_by_ids(entry_ids)
             
-            entry_ref = self.db.collection('journal_entries').document(entry_id)
+            updated_count = 0
+            failed_count = 0
+            for start in range(0, len(entries), BATCH_WRITE_LIMIT):
+                chunk_updated, chunk_failed = self._detect_and_write_moods(entries[start:start + BATCH_WRITE_LIMIT])
+                updated_count += chunk_updated
+                failed_count += chunk_failed
             
-            update_data = {
-                'mood': mood_data['primary_mood'],
-                'moodConfidence': mood_data['confidence'],
-                'detectedEmotions': mood_data['emotions'],
-                'sentimentScore': mood_data['sentiment_score'],
-                'moodKeywords': mood_data['keywords'],
-                'aiMoodDetection': True,
-                'moodDetectedAt': firestore.SERVER_TIMESTAMP
+            # Invalidate analytics for every owner of a changed entry
+            if updated_count:
+                for user_id in {entry.get('userId') for entry in entries} - {None}:
+                    self._invalidate_analytics_cache(user_id)
+            
+            return {
+                'updated_count': updated_count,
+                'failed_count': failed_count,
+                'total_processed': len(entries)
             }
             
-            entry_ref.update(update_data)
+        except Exception as e:
+            logger.error(f"Error re-detecting entry moods: {e}")
+            return {
+                'updated_count': 0,
+                'failed_count': 0,
+                'total_processed': 0,
+                'error': str(e)
+            }
+    
+    def update_entry_mood(self, entry_id, mood_data, user_id=None):
+        """Update an entry with detected mood
+        
+        Pass the entry owner's user_id to invalidate their cached analytics.
+        """
+        try:
+            if not self.db:
+                raise Exception("Firebase not initialized")
+            
+            entry_ref = self.db.collection('journal_entries').document(entry_id)
+            entry_ref.update(self._mood_update_data(mood_data))
             logger.info(f"Updated entry {entry_id} with mood: {mood_data['primary_mood']}")
             
+            if user_id:
+                self._invalidate_analytics_cache(user_id)
+            
             return True
             
         except Exception as e:
             logger.error(f"Error updating entry mood: {e}")
             return False
     
+    def update_entry_moods(self, mood_updates):
+        """Update many entries with detected moods using batched writes
+        
+        Takes (entry_id, mood_data) pairs and returns (updated_count, failed_count).
+        """
+        return self._batch_update_entries(
+            (entry_id, self._mood_update_data(mood_data))
+            for entry_id, mood_data in mood_updates
+        )
+    
+    def _batch_update_entries(self, updates):
+        """Apply (entry_id, update_data) pairs in write batches of up to BATCH_WRITE_LIMIT"""
+        if not self.db:
+            raise Exception("Firebase not initialized")
+        
+        entries_ref = self.db.collection('journal_entries')
+        updated_count = 0
+        failed_count = 0
+        batch = self.db.batch()
+        pending = 0
+        
+        for entry_id, update_data in updates:
+            batch.update(entries_ref.document(entry_id), update_data)
+            pending += 1
+            
+            if pending == BATCH_WRITE_LIMIT:
+                written = self._commit_batch(batch, pending)
+                updated_count += written
+                failed_count += pending - written
+                batch = self.db.batch()
+                pending = 0
+        
+        if pending:
+            written = self._commit_batch(batch, pending)
+            updated_count += written
+            failed_count += pending - written
+        
+        return updated_count, failed_count
+    
+    def _commit_batch(self, batch, size):
+        """Commit a write batch, returning how many writes were applied"""
+        try:
+            results = batch.commit()
+            logger.info(f"Committed batch of {len(results)} entry updates")
+            return len(results)
+        except Exception as e:
+            # Batches are atomic, so a failed commit applies none of its writes
+            logger.error(f"Error committing batch of {size} entry updates: {e}")
+            return 0
+    
+    def _mood_update_data(self, mood_data):
+        """Build the Firestore fields written for a detected mood"""
+        return {
+            'mood': mood_data['primary_mood'],
+            'moodConfidence': mood_data['confidence'],
+            'detectedEmotions': mood_data['emotions'],
+            'sentimentScore': mood_data['sentiment_score'],
+            'moodKeywords': mood_data['keywords'],
+            'aiMoodDetection': True,
+            'moodDetectedAt': firestore.SERVER_TIMESTAMP
+        }
+    
     def update_entries_with_mood_detection(self, user_id):
-        """Auto-detect and update moods for all user entries"""
+        """Auto-detect and update moods for all user entries
+        
+        total_processed counts every entry fetched, including those skipped
+        because they already had AI mood detection.
+        """
+        updated_count = 0
+        failed_count = 0
+        total_processed = 0
+        
         try:
-            # Get all entries for the user
-            entries = self.get_user_entries(user_id)
-            
-            updated_count = 0
-            failed_count = 0
-            
-            for entry in entries:
-                try:
-                    # Skip if mood already detected by AI
-                    if entry.get('aiMoodDetection'):
-                        continue
-                    
-                    # Detect mood from content
-                    content = entry.get('content', '')
-                    if not content:
-                        continue
-                    
-                    mood_result = self.mood_detector.detect_mood(content)
-                    
-                    # Update the entry
-                    if self.update_entry_mood(entry['id'], mood_result):
-                        updated_count += 1
-                    else:
-                        failed_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error processing entry {entry.get('id', 'unknown')}: {e}")
-                    failed_count += 1
+            # Fetch, detect and commit one page of entries at a time, so large
+            # histories are never held in memory or behind one open stream
+            for page in self.iter_user_entry_pages(user_id):
+                total_processed += len(page)
+                
+                # Skip entries already detected by AI
+                chunk = [entry for entry in page if not entry.get('aiMoodDetection')]
+                if not chunk:
+                    continue
+                
+                chunk_updated, chunk_failed = self._detect_and_write_moods(chunk)
+                updated_count += chunk_updated
+                failed_count += chunk_failed
             
             logger.info(f"Mood detection complete: {updated_count} updated, {failed_count} failed")
             
             return {
                 'updated_count': updated_count,
                 'failed_count': failed_count,
-                'total_processed': len(entries)
+                'total_processed': total_processed
             }
             
         except Exception as e:
+            # Pages committed before the error stay written, so report them
             logger.error(f"Error in batch mood detection: {e}")
             return {
-                'updated_count': 0,
-                'failed_count': 0,
-                'total_processed': 0,
+                'updated_count': updated_count,
+                'failed_count': failed_count,
+                'total_processed': total_processed,
                 'error': str(e)
             }
+        
+        finally:
+            if updated_count:
+                self._invalidate_analytics_cache(user_id)
+    
+    def _detect_and_write_moods(self, entries):
+        """Detect moods for a chunk of entries and write them in one batch"""
+        # Skip entries without content; non-string content counts as failed
+        pending_entries = []
+        invalid_count = 0
+        for entry in entries:
+            content = entry.get('content', '')
+            if not content:
+                continue
+            if not isinstance(content, str):
+                logger.warning(f"Entry {entry.get('id', 'unknown')}: content is {type(content)}, skipping mood detection")
+                invalid_count += 1
+                continue
+            pending_entries.append(entry)
+        
+        if not pending_entries:
+            return 0, invalid_count
+        
+        # Classify the chunk through the batched model path
+        mood_results = self.mood_detector.detect_moods_batch(
+            [entry['content'] for entry in pending_entries]
+        )
+        
+        updated_count, failed_count = self.update_entry_moods(
+            (entry['id'], mood_result)
+            for entry, mood_result in zip(pending_entries, mood_results)
+        )
+        return updated_count, failed_count + invalid_count
     
     def get_user_analytics_cache(self, user_id):
         """Get cached analytics for a user"""
+        insights = self._get_l1_analytics(user_id)
+        if insights is not None:
+            return insights
+        
         try:
             if not self.db:
                 return None
@@ -150,13 +458,9 @@ class FirebaseService:
             cache_doc = cache_ref.get()
             
             if cache_doc.exists:
-                cache_data = cache_doc.to_dict()
-                # Check if cache is still valid (less than 1 hour old)
-                cache_time = cache_data.get('generated_at')
-                if cache_time:
-                    from datetime import datetime, timedelta
-                    if datetime.now() - cache_time.replace(tzinfo=None) < timedelta(hours=1):
-                        return cache_data.get('insights')
+                insights = self._valid_cached_insights(cache_doc.to_dict())
+                self._set_l1_analytics(user_id, insights)
+                return insights
             
             return None
             
@@ -164,6 +468,14 @@ class FirebaseService:
             logger.error(f"Error getting analytics cache: {e}")
             return None
     
+    def _valid_cached_insights(self, cache_data):
+        """Return cached insights if the cache entry has not expired"""
+        # Check if cache is still valid (expiry is set when saved)
+        expires_at = cache_data.get('expires_at')
+        if expires_at and expires_at > datetime.now(timezone.utc):
+            return cache_data.get('insights')
+        return None
+    
     def save_user_analytics_cache(self, user_id, insights):
         """Save analytics cache for a user"""
         try:
@@ -171,14 +483,8 @@ class FirebaseService:
                 return False
             
             cache_ref = self.db.collection('analytics_cache').document(user_id)
-            
-            cache_data = {
-                'insights': insights,
-                'generated_at': firestore.SERVER_TIMESTAMP,
-                'user_id': user_id
-            }
-            
-            cache_ref.set(cache_data)
+            cache_ref.set(self._analytics_cache_data(user_id, insights))
+            self._set_l1_analytics(user_id, insights)
             logger.info(f"Saved analytics cache for user {user_id}")
             
             return True
@@ -187,22 +493,75 @@ class FirebaseService:
             logger.error(f"Error saving analytics cache: {e}")
             return False
     
-    def log_analytics_request(self, user_id, request_type, processing_time):
-        """Log analytics request for monitoring"""
+    def _analytics_cache_data(self, user_id, insights):
+        """Build the analytics_cache document saved for a user"""
+        return {
+            'insights': insights,
+            'generated_at': firestore.SERVER_TIMESTAMP,
+            'expires_at': datetime.now(timezone.utc) + ANALYTICS_CACHE_TTL,
+            'user_id': user_id
+        }
+    
+    def _invalidate_analytics_cache(self, user_id):
+        """Drop a user's cached analytics after their entries change"""
+        with _ANALYTICS_L1_LOCK:
+            _ANALYTICS_L1.pop(user_id, None)
+        
         try:
             if not self.db:
                 return
             
-            log_ref = self.db.collection('analytics_logs')
+            self.db.collection('analytics_cache').document(user_id).delete()
+            logger.info(f"Invalidated analytics cache for user {user_id}")
+            
+        except Exception as e:
+            logger.error(f"Error invalidating analytics cache: {e}")
+    
+    def _get_l1_analytics(self, user_id):
+        """Get insights from the in-process cache if present and fresh"""
+        with _ANALYTICS_L1_LOCK:
+            cached = _ANALYTICS_L1.get(user_id)
+            if cached is None:
+                return None
+            
+            cached_at, insights = cached
+            if time.monotonic() - cached_at > ANALYTICS_L1_TTL_SECONDS:
+                del _ANALYTICS_L1[user_id]
+                return None
+            
+            _ANALYTICS_L1.move_to_end(user_id)
+            return insights
+    
+    def _set_l1_analytics(self, user_id, insights):
+        """Store insights in the in-process cache, evicting the least recently used"""
+        if insights is None:
+            return
+        
+        with _ANALYTICS_L1_LOCK:
+            _ANALYTICS_L1[user_id] = (time.monotonic(), insights)
+            _ANALYTICS_L1.move_to_end(user_id)
+            while len(_ANALYTICS_L1) > ANALYTICS_L1_MAXSIZE:
+                _ANALYTICS_L1.popitem(last=False)
+    
+    def log_analytics_request(self, user_id, request_type, processing_time):
+        """Log analytics request for monitoring
+        
+        The log is queued and written in the background, off the request path.
+        """
+        try:
+            if not self.db:
+                return
             
             log_data = {
                 'user_id': user_id,
                 'request_type': request_type,
                 'processing_time': processing_time,
-                'timestamp': firestore.SERVER_TIMESTAMP
+                # Request time on the client; a server timestamp would record the later flush
+                'timestamp': datetime.now(timezone.utc)
             }
             
-            log_ref.add(log_data)
+            _start_log_writer()
+            _LOG_QUEUE.put_nowait(log_data)
             
         except Exception as e:
             logger.error(f"Error logging analytics request: {e}")
@@ -1,264 +1,652 @@
 import os
 import re
+import sys
 import numpy as np
-from textblob import TextBlob
+import torch
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+from transformers import pipeline, AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
 import logging
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+try:
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    OPTIMUM_AVAILABLE = True
+except ImportError:
+    OPTIMUM_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# URLs, mentions and hashtags, stripped in one pass during preprocessing
+_STRIP_RE = re.compile(r"http\S+|www\S+|[@#]\w+")
+
+# Recently analyzed texts whose keyword matches, sentiment and emotions are kept
+KEYWORD_CACHE_SIZE = 1024
+SENTIMENT_CACHE_SIZE = 4096
+EMOTION_CACHE_SIZE = 4096
+
+# Texts per forward pass when classifying emotions in bulk
+EMOTION_BATCH_SIZE = 32
+
+EMOTION_MODEL_NAME = "bhadresh-savani/distilbert-base-uncased-emotion"
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "./models")
+USE_ONNX_QUANTIZED = os.getenv("USE_ONNX_QUANTIZED", "True").lower() == "true"
+QUANTIZED_MODEL_DIR = os.path.join(MODEL_CACHE_DIR, "emotion-onnx-int8")
+QUANTIZED_MODEL_PATH = os.path.join(QUANTIZED_MODEL_DIR, "model_quantized.onnx")
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", os.cpu_count() or 1))
+TORCH_COMPILE = os.getenv("TORCH_COMPILE", "False").lower() == "true"
+
+# Tokens per text fed to the emotion model; a compiled model gets every input
+# padded to the shorter fixed length, which covers nearly all journal entries
+EMOTION_MAX_LENGTH = 512
+COMPILED_MAX_LENGTH = 128
+
+# Short texts with a strong VADER score skip the emotion model entirely
+FAST_PATH_MIN_COMPOUND = 0.7
+FAST_PATH_MAX_WORDS = 20
+
+# Labels produced by the emotion classification model
+EMOTION_MODEL_LABELS = ("sadness", "joy", "love", "anger", "fear", "surprise")
+
+# Weights of each approach when combining mood predictions
+SENTIMENT_WEIGHT = 0.3
+EMOTION_WEIGHT = 0.4
+KEYWORD_WEIGHT = 0.2
+
+# Emotion keywords mapping; interned tuples built once and shared by every detector
+EMOTION_KEYWORDS = {
+    emotion: tuple(sys.intern(keyword) for keyword in keywords)
+    for emotion, keywords in {
+        "happy": ["happy", "joy", "excited", "cheerful", "delighted", "pleased", "content","satisfied", "glad", "elated",],
+        "sad": [
+            "sad",
+            "depressed",
+            "heartbroken",
+            "lonely",
+            "rejected",
+            "crying",
+            "cheated",
+        ],
+        "angry": ["angry", "mad", "rage", "betrayed", "cheated"],
+        "anxious": ["worried", "scared", "insecure", "paranoid"],
+        "excited": [
+            "excited",
+            "thrilled",
+            "enthusiastic",
+            "eager",
+            "pumped",
+            "energetic",
+            "animated",
+            "exhilarated",
+            "ecstatic",
+        ],
+        "calm": [
+            "calm",
+            "peaceful",
+            "relaxed",
+            "serene",
+            "tranquil",
+            "composed",
+            "zen",
+            "balanced",
+            "centered",
+            "still",
+        ],
+        "grateful": [
+            "grateful",
+            "thankful",
+            "appreciative",
+            "blessed",
+            "fortunate",
+            "lucky",
+            "indebted",
+            "obliged",
+        ],
+        "confused": ["confused","puzzled","bewildered","perplexed","uncertain","unclear","lost","mixed up"],
+        "surprised": ["surprised","shocked", "amazed", "astonished", "stunned", "startled", "bewildered", "flabbergasted"],
+        "tired": ["tired","exhausted","weary","fatigued","drained","worn out","sleepy","lethargic","spent",],
+        "heartbroken": ["sad", "betrayed", "broken", "hurt", "grief"],
+        "cheater": ["betrayed", "deceived", "heartbroken"],
+    }.items()
+}
+
+def _softmax(logits):
+    """Row-wise softmax over a 2D array of logits"""
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+class OnnxEmotionClassifier:
+    """Emotion classifier running an ONNX model directly on an ONNX Runtime session
+
+    Called like the transformers pipeline it replaces, returning a list of
+    {"label", "score"} dicts per text, without the pipeline's per-item overhead.
+    """
+
+    def __init__(self, model_path, tokenizer, labels):
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.tokenizer = tokenizer
+        self.labels = labels
+        self._input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def __call__(self, texts, batch_size=EMOTION_BATCH_SIZE, truncation=True, max_length=EMOTION_MAX_LENGTH):
+        if isinstance(texts, str):
+            texts = [texts]
+
+        results = []
+        for start in range(0, len(texts), batch_size):
+            # Pad each batch only to its own longest text
+            inputs = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=truncation,
+                max_length=max_length,
+                return_tensors="np",
+            )
+            feed = {name: inputs[name].astype(np.int64) for name in self._input_names}
+            probabilities = _softmax(self.session.run(None, feed)[0])
+
+            for row in probabilities.tolist():
+                results.append([{"label": label, "score": score} for label, score in zip(self.labels, row)])
+
+        return results
+
+def export_quantized_model(save_dir=QUANTIZED_MODEL_DIR):
+    """Export the emotion model to ONNX and dynamically quantize it to int8
+
+    Run once at image build time (see export_model.py); the service itself
+    only loads the exported model.
+    """
+    if not OPTIMUM_AVAILABLE:
+        raise RuntimeError("optimum is required to export the quantized emotion model")
+
+    onnx_model = ORTModelForSequenceClassification.from_pretrained(EMOTION_MODEL_NAME, export=True)
+    quantizer = ORTQuantizer.from_pretrained(onnx_model)
+    quantizer.quantize(
+        save_dir=save_dir,
+        quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False),
+    )
+    onnx_model.config.save_pretrained(save_dir)
+    AutoTokenizer.from_pretrained(EMOTION_MODEL_NAME).save_pretrained(save_dir)
+
+def quantized_model_available():
+    """Whether the quantized ONNX model is enabled, runnable and already exported"""
+    return USE_ONNX_QUANTIZED and ONNXRUNTIME_AVAILABLE and os.path.exists(QUANTIZED_MODEL_PATH)
+
+def _is_word_char(char):
+    """Whether a character is a word character (letter, digit or underscore)"""
+    return char.isalnum() or char == "_"
+
+@lru_cache(maxsize=4096)
+def _preprocess_cached(text):
+    """Strip URLs, mentions and hashtags, lowercase and count words; cached per raw text"""
+    tokens = _STRIP_RE.sub("", text).lower().split()
+    return " ".join(tokens), len(tokens)
+
 class MoodDetector:
+    EMOTION_KEYWORDS = EMOTION_KEYWORDS
+
     def __init__(self):
         self.vader_analyzer = SentimentIntensityAnalyzer()
         self.emotion_classifier = None
+        self._tokenizer = None
+        self._tokenizer_kwargs = {"truncation": True, "max_length": EMOTION_MAX_LENGTH}
 
-        # Emotion keywords mapping
-        self.emotion_keywords = {
-            "happy": ["happy", "joy", "excited", "cheerful", "delighted", "pleased", "content","satisfied", "glad", "elated",],
-            "sad": [
-                "sad",
-                "depressed",
-                "heartbroken",
-                "lonely",
-                "rejected",
-                "crying",
-                "cheated",
-            ],
-            "angry": ["angry", "mad", "rage", "betrayed", "cheated"],
-            "anxious": ["worried", "scared", "insecure", "paranoid"],
-            "excited": [
-                "excited",
-                "thrilled",
-                "enthusiastic",
-                "eager",
-                "pumped",
-                "energetic",
-                "animated",
-                "exhilarated",
-                "ecstatic",
-            ],
-            "calm": [
-                "calm",
-                "peaceful",
-                "relaxed",
-                "serene",
-                "tranquil",
-                "composed",
-                "zen",
-                "balanced",
-                "centered",
-                "still",
-            ],
-            "grateful": [
-                "grateful",
-                "thankful",
-                "appreciative",
-                "blessed",
-                "fortunate",
-                "lucky",
-                "indebted",
-                "obliged",
-            ],
-            "confused": ["confused","puzzled","bewildered","perplexed","uncertain","unclear","lost","mixed up"],
-            "surprised": ["surprised","shocked", "amazed", "astonished", "stunned", "startled", "bewildered", "flabbergasted"],
-            "tired": ["tired","exhausted","weary","fatigued","drained","worn out","sleepy","lethargic","spent",],
-            "heartbroken": ["sad", "betrayed", "broken", "hurt", "grief"],
-            "cheater": ["betrayed", "deceived", "heartbroken"],
-        }
+        # Runs model inference alongside the CPU-side sentiment and keyword work
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="emotion-classifier")
+
+        # Emotion keywords mapping, shared by every detector
+        self.emotion_keywords = EMOTION_KEYWORDS
+
+        # Each keyword maps to every emotion listing it, so a keyword shared by
+        # several emotions is searched for once and credited to all of them
+        keyword_emotions = defaultdict(list)
+        for emotion, keywords in self.emotion_keywords.items():
+            for keyword in keywords:
+                keyword_emotions[keyword].append(emotion)
+        self._keyword_emotions = {keyword: tuple(emotions) for keyword, emotions in keyword_emotions.items()}
+
+        self._keyword_automaton = None
+        if AHOCORASICK_AVAILABLE:
+            self._keyword_automaton = ahocorasick.Automaton()
+            for keyword in self._keyword_emotions:
+                self._keyword_automaton.add_word(keyword, keyword)
+            self._keyword_automaton.make_automaton()
+
+        # Without pyahocorasick, one whole-word alternation, longest keywords first
+        self._keyword_pattern = re.compile(
+            r"\b(" + "|".join(map(re.escape, sorted(self._keyword_emotions, key=len, reverse=True))) + r")\b"
+        )
+
+        # Repeated texts (autosaves, retries) reuse their keyword matches,
+        # sentiment scores and emotion predictions
+        self._find_keywords = lru_cache(maxsize=KEYWORD_CACHE_SIZE)(self._match_keywords)
+        self._cached_sentiment = lru_cache(maxsize=SENTIMENT_CACHE_SIZE)(self._score_sentiment)
+        self._emotion_cache = OrderedDict()
+        self._emotion_cache_lock = threading.Lock()
+
+        # Keyword presence per document (via the same matcher) and a
+        # keyword x emotion indicator, so a batch is scored with one sparse product
+        self._keywords = list(self._keyword_emotions)
+        self._keyword_vectorizer = CountVectorizer(
+            analyzer=self._find_keywords,
+            vocabulary=self._keywords,
+            binary=True,
+        )
+        emotion_ids = {emotion: i for i, emotion in enumerate(self.emotion_keywords)}
+        rows, cols = zip(*(
+            (keyword_id, emotion_ids[emotion])
+            for keyword_id, keyword in enumerate(self._keywords)
+            for emotion in self._keyword_emotions[keyword]
+        ))
+        # Stored already transposed, so scoring doesn't re-transpose it per batch
+        self._keyword_emotion_matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=(len(self._keywords), len(emotion_ids)),
+        )
+
+        # Every mood a prediction can score, indexed for array accumulation. Ties
+        # go to the earliest column, so model labels come before keyword
+        # emotions, in the order the scores were merged before
+        self._mood_names = list(dict.fromkeys([*EMOTION_MODEL_LABELS, *self.emotion_keywords, "happy", "sad", "neutral"]))
+        self._mood_index = {mood: i for i, mood in enumerate(self._mood_names)}
+        self._keyword_mood_ids = np.array([self._mood_index[emotion] for emotion in self.emotion_keywords])
 
     def initialize_models(self):
         """Initialize AI models"""
-       
+        torch.set_num_threads(TORCH_NUM_THREADS)
+
+        # Prefer the int8-quantized ONNX model, falling back to the PyTorch one
+        if quantized_model_available():
+            try:
+                self.emotion_classifier = self._load_quantized_classifier()
+                logger.info("Quantized ONNX emotion classification model initialized")
+            except Exception as e:
+                logger.warning(f"Could not load quantized emotion model, using PyTorch model: {e}")
+        elif USE_ONNX_QUANTIZED:
+            logger.warning(f"Quantized emotion model not found at {QUANTIZED_MODEL_PATH}, using PyTorch model")
+
         # Initialize emotion classification model
+        if not self.emotion_classifier:
+            try:
+                # Rust-backed fast tokenizer; top_k=None returns every label's score
+                self._tokenizer = AutoTokenizer.from_pretrained(EMOTION_MODEL_NAME, use_fast=True)
+
+                # Half precision on GPU; scores are only weighted and argmaxed
+                use_cuda = torch.cuda.is_available()
+                self.emotion_classifier = pipeline(
+                    "text-classification",
+                    model=EMOTION_MODEL_NAME,
+                    tokenizer=self._tokenizer,
+                    top_k=None,
+                    device=0 if use_cuda else -1,
+                    torch_dtype=torch.float16 if use_cuda else None,
+                )
+                logger.info("Emotion classification model initialized")
+
+                if TORCH_COMPILE:
+                    self._compile_classifier()
+            except Exception as e:
+                logger.warning(f"Could not load emotion model: {e}")
+
+        if self.emotion_classifier:
+            self._warm_up_classifier()
+
+    def _compile_classifier(self):
+        """Compile the PyTorch emotion model, padding inputs to a fixed length
+
+        The sequence length is fixed and the batch dimension is compiled as
+        dynamic, so full batches and the smaller final batch share one graph.
+        torch.compile is lazy, so a batch is run here to surface compile errors;
+        on any failure the eager model and default tokenizer arguments are kept.
+        """
+        model = self.emotion_classifier.model.eval()
         try:
-            model_name = "bhadresh-savani/distilbert-base-uncased-emotion"
-            self.emotion_classifier = pipeline(
-                "text-classification",
-                model=model_name,
-                tokenizer=model_name,
-                return_all_scores=True,
+            # CUDA graphs ("reduce-overhead") only pay off on GPU
+            mode = "reduce-overhead" if model.device.type == "cuda" else "default"
+            self.emotion_classifier.model = torch.compile(model, mode=mode, dynamic=True)
+            self._tokenizer_kwargs = {
+                "truncation": True,
+                "padding": "max_length",
+                "max_length": COMPILED_MAX_LENGTH,
+            }
+            self.emotion_classifier(
+                ["warmup"] * EMOTION_BATCH_SIZE,
+                batch_size=EMOTION_BATCH_SIZE,
+                **self._tokenizer_kwargs,
             )
-            logger.info("Emotion classification model initialized")
+            logger.info("Emotion classification model compiled")
+        except Exception as e:
+            self.emotion_classifier.model = model
+            self._tokenizer_kwargs = {"truncation": True, "max_length": EMOTION_MAX_LENGTH}
+            logger.warning(f"Could not compile emotion model, using eager mode: {e}")
+
+    def _warm_up_classifier(self):
+        """Run throwaway inferences so the first real request doesn't pay setup costs"""
+        try:
+            self.emotion_classifier("warmup", **self._tokenizer_kwargs)
+
+            # On GPU, also run a full batch to allocate memory at the batched shape
+            device = getattr(self.emotion_classifier, "device", None)
+            if device is not None and device.type == "cuda":
+                self.emotion_classifier(
+                    ["warmup"] * EMOTION_BATCH_SIZE,
+                    batch_size=EMOTION_BATCH_SIZE,
+                    **self._tokenizer_kwargs,
+                )
         except Exception as e:
-            logger.warning(f"Could not load emotion model: {e}")
+            logger.warning(f"Emotion model warm-up failed: {e}")
+
+    def _load_quantized_classifier(self):
+        """Load the int8-quantized ONNX emotion model into an ORT session
+
+        The model is exported ahead of time by export_quantized_model.
+        """
+        config = AutoConfig.from_pretrained(QUANTIZED_MODEL_DIR)
+        labels = [config.id2label[i] for i in range(config.num_labels)]
+        self._tokenizer = AutoTokenizer.from_pretrained(QUANTIZED_MODEL_DIR, use_fast=True)
+
+        return OnnxEmotionClassifier(QUANTIZED_MODEL_PATH, self._tokenizer, labels)
 
 
     def detect_mood(self, text):
         """Detect mood from using hugging face LLM"""
+        return self.detect_moods_batch([text])[0]
+
+    def detect_moods_batch(self, texts):
+        """Detect moods for many texts, classifying emotions in batched forward passes"""
         try:
-            # Clean and preprocess text
-            cleaned_text = self._preprocess_text(text)
+            # Clean and preprocess text, counting each text's words once
+            preprocessed = [self._preprocess_text(text) for text in texts]
+            cleaned_texts = [cleaned_text for cleaned_text, _ in preprocessed]
+            word_counts = [n_words for _, n_words in preprocessed]
 
             # Get sentiment scores
-            sentiment_scores = self._analyze_sentiment(cleaned_text)
+            sentiment_scores = [self._analyze_sentiment(text) for text in cleaned_texts]
 
-            # Get emotion predictions
-            emotion_scores = self._classify_emotions(cleaned_text)
-
-            # Get keyword-based emotions
-            keyword_emotions = self._detect_keyword_emotions(cleaned_text)
+            # Short, clearly positive or negative texts are decided by sentiment
+            # and keywords alone; only the rest go through the emotion model
+            model_ids = [
+                i for i, (sentiment, n_words) in enumerate(zip(sentiment_scores, word_counts))
+                if abs(sentiment["compound"]) <= FAST_PATH_MIN_COMPOUND or n_words >= FAST_PATH_MAX_WORDS
+            ]
+            logger.debug(f"Emotion model fast path: {len(texts) - len(model_ids)} of {len(texts)} texts skipped")
 
-            # Combine all approaches for final mood
-            final_mood = self._combine_mood_predictions(
-                sentiment_scores, emotion_scores, keyword_emotions
+            # Start emotion predictions for those texts at once; the model runs
+            # outside the GIL, so keyword scoring overlaps with it
+            emotion_future = self._executor.submit(
+                self._classify_emotions_batch, [cleaned_texts[i] for i in model_ids]
             )
 
-            return {
-                "primary_mood": final_mood["mood"],
-                "confidence": final_mood["confidence"],
-                "emotions": emotion_scores,
-                "sentiment_score": sentiment_scores["compound"],
-                "keywords": self._extract_mood_keywords(cleaned_text),
-                "detailed_analysis": {
-                    "sentiment": sentiment_scores,
-                    "keyword_emotions": keyword_emotions,
-                },
-            }
+            # Score keywords for the whole batch with one sparse product
+            if len(cleaned_texts) > 1:
+                keyword_results = self._detect_keyword_emotions_batch(cleaned_texts, word_counts)
+            else:
+                keyword_results = [
+                    self._detect_keyword_emotions(text, n_words)
+                    for text, n_words in zip(cleaned_texts, word_counts)
+                ]
+
+            emotion_scores = [{} for _ in texts]
+            for i, emotions in zip(model_ids, emotion_future.result()):
+                emotion_scores[i] = emotions
+
+            # Combine all approaches for every text's final mood
+            final_moods = self._combine_mood_predictions_batch(
+                sentiment_scores,
+                emotion_scores,
+                [keyword_emotions for keyword_emotions, _ in keyword_results],
+            )
 
         except Exception as e:
-            logger.error(f"Error detecting mood: {e}")
-            return self._fallback_mood_detection(text)
+            if len(texts) == 1:
+                logger.error(f"Error detecting mood: {e}")
+                return [self._fallback_mood_detection(texts[0])]
 
-    def _preprocess_text(self, text):
-        """Clean and preprocess text"""
-        # Remove URLs, mentions, hashtags
-        text = re.sub(r"http\S+|www\S+|https\S+", "", text, flags=re.MULTILINE)
-        text = re.sub(r"@\w+|#\w+", "", text)
+            # Retry texts one at a time, so a bad text only degrades its own result
+            logger.error(f"Error detecting moods for a batch of {len(texts)}, retrying individually: {e}")
+            return [mood_result for text in texts for mood_result in self.detect_moods_batch([text])]
+
+        return [
+            self._build_mood_result(final_mood, sentiment, emotions, keyword_result)
+            for final_mood, sentiment, emotions, keyword_result
+            in zip(final_moods, sentiment_scores, emotion_scores, keyword_results)
+        ]
+
+    def _build_mood_result(self, final_mood, sentiment_scores, emotion_scores, keyword_result):
+        """Assemble a text's mood result from its combined mood and analyses"""
+        # Keyword-based emotions and the keywords that matched
+        keyword_emotions, mood_keywords = keyword_result
+
+        return {
+            "primary_mood": final_mood["mood"],
+            "confidence": final_mood["confidence"],
+            "emotions": emotion_scores,
+            "sentiment_score": sentiment_scores["compound"],
+            "keywords": mood_keywords,
+            "detailed_analysis": {
+                "sentiment": sentiment_scores,
+                "keyword_emotions": keyword_emotions,
+            },
+        }
 
-        # Remove extra whitespace
-        text = " ".join(text.split())
+    def _preprocess_text(self, text):
+        """Clean and preprocess text
 
-        return text.lower().strip()
+        Returns the cleaned text and its word count, so later stages don't re-split it.
+        """
+        return _preprocess_cached(text)
 
     def _analyze_sentiment(self, text):
-        """Analyze sentiment using VADER and TextBlob"""
-        # VADER sentiment
-        vader_scores = self.vader_analyzer.polarity_scores(text)
+        """Analyze sentiment using VADER"""
+        # Copy, since the result ends up in the caller's mood result
+        return dict(self._cached_sentiment(text))
 
-        # TextBlob sentiment
-        blob = TextBlob(text)
-        textblob_polarity = blob.sentiment.polarity
-        textblob_subjectivity = blob.sentiment.subjectivity
+    def _score_sentiment(self, text):
+        """Score sentiment with VADER; called through the LRU as self._cached_sentiment"""
+        vader_scores = self.vader_analyzer.polarity_scores(text)
 
+        # Polarity and subjectivity come from VADER too, rather than a second
+        # tokenize-and-score pass with TextBlob
         return {
             "compound": vader_scores["compound"],
             "positive": vader_scores["pos"],
             "negative": vader_scores["neg"],
             "neutral": vader_scores["neu"],
-            "polarity": textblob_polarity,
-            "subjectivity": textblob_subjectivity,
+            "polarity": vader_scores["compound"],
+            "subjectivity": 1.0 - vader_scores["neu"],
         }
 
     def _classify_emotions(self, text):
         """Classify emotions using transformer model"""
-        if not self.emotion_classifier:
-            return {}
-
-        try:
-            # Truncate text if too long
-            if len(text) > 512:
-                text = text[:512]
+        return self._classify_emotions_batch([text])[0]
 
-            results = self.emotion_classifier(text)
+    def _classify_emotions_batch(self, texts):
+        """Classify emotions for many texts in batched forward passes"""
+        if not self.emotion_classifier or not texts:
+            return [{} for _ in texts]
 
-            # Convert to dictionary
-            emotions = {}
-            for result in results[0]:
-                emotions[result["label"].lower()] = result["score"]
+        try:
+            # Only run the model on distinct texts it hasn't scored recently
+            emotions = self._get_cached_emotions(texts)
+            misses = [text for text in dict.fromkeys(texts) if text not in emotions]
 
-            return emotions
+            if misses:
+                # Sort by length so each batch holds similar lengths and is padded
+                # only to its own longest text
+                order = np.argsort([len(text) for text in misses], kind="stable")
 
-        except Exception as e:
-            logger.error(f"Error in emotion classification: {e}")
-            return {}
+                # Let the tokenizer truncate long texts to the model's input size
+                sorted_results = self.emotion_classifier(
+                    [misses[i] for i in order],
+                    batch_size=EMOTION_BATCH_SIZE,
+                    **self._tokenizer_kwargs,
+                )
 
-    def _detect_keyword_emotions(self, text):
-        """Detect emotions based on keywords"""
-        emotion_scores = {}
-        words = text.split()
+                # Convert each text's scores to a dictionary
+                classified = {}
+                for i, text_results in zip(order.tolist(), sorted_results):
+                    classified[misses[i]] = {result["label"].lower(): result["score"] for result in text_results}
 
-        for emotion, keywords in self.emotion_keywords.items():
-            score = 0
-            for keyword in keywords:
-                if keyword in text:
-                    score += 1
+                self._cache_emotions(classified)
+                emotions.update(classified)
 
-            # Normalize by text length
-            if len(words) > 0:
-                emotion_scores[emotion] = score / len(words)
-            else:
-                emotion_scores[emotion] = 0
+            # Copies in input order, since each ends up in a caller's mood result
+            return [dict(emotions[text]) for text in texts]
 
-        return emotion_scores
+        except Exception as e:
+            logger.error(f"Error in emotion classification: {e}")
+            return [{} for _ in texts]
+
+    def _get_cached_emotions(self, texts):
+        """Get recently classified emotions for any of the texts"""
+        cached = {}
+        with self._emotion_cache_lock:
+            for text in texts:
+                emotions = self._emotion_cache.get(text)
+                if emotions is not None:
+                    self._emotion_cache.move_to_end(text)
+                    cached[text] = emotions
+        return cached
+
+    def _cache_emotions(self, classified):
+        """Remember classified emotions, evicting the least recently used"""
+        with self._emotion_cache_lock:
+            self._emotion_cache.update(classified)
+            while len(self._emotion_cache) > EMOTION_CACHE_SIZE:
+                self._emotion_cache.popitem(last=False)
+
+    def _detect_keyword_emotions(self, text, n_words):
+        """Detect emotions based on keywords
+
+        Returns the per-emotion scores and the list of keywords found in the text.
+        """
+        hits = self._find_keywords(text)
+
+        scores = dict.fromkeys(self.emotion_keywords, 0)
+        for keyword in hits:
+            for emotion in self._keyword_emotions[keyword]:
+                scores[emotion] += 1
+
+        # Normalize by text length
+        if n_words > 0:
+            emotion_scores = {emotion: score / n_words for emotion, score in scores.items()}
+        else:
+            emotion_scores = scores
+
+        return emotion_scores, list(hits)
+
+    def _detect_keyword_emotions_batch(self, texts, word_counts):
+        """Detect keyword emotions for many texts, as _detect_keyword_emotions does for one"""
+        # Documents x keywords presence, then documents x emotions keyword counts
+        presence = self._keyword_vectorizer.transform(texts)
+        counts = (presence @ self._keyword_emotion_matrix).toarray()
+
+        # Normalize by text length
+        n_words = np.array(word_counts, dtype=float)
+        scores = np.divide(counts, n_words[:, None], out=np.zeros_like(counts), where=n_words[:, None] > 0)
+
+        emotions = list(self.emotion_keywords)
+        results = []
+        for i, row in enumerate(scores.tolist()):
+            hit_ids = presence.indices[presence.indptr[i]:presence.indptr[i + 1]]
+            results.append((dict(zip(emotions, row)), [self._keywords[k] for k in hit_ids]))
+
+        return results
+
+    def _match_keywords(self, text):
+        """Find every emotion keyword occurring as whole words in the text in a single pass
+
+        Called through the per-instance LRU as self._find_keywords.
+        """
+        if self._keyword_automaton is None:
+            return frozenset(self._keyword_pattern.findall(text))
+
+        # The automaton matches substrings; keep only hits on word boundaries,
+        # so "mad" doesn't match inside "made"
+        last = len(text) - 1
+        return frozenset(
+            keyword
+            for end, keyword in self._keyword_automaton.iter(text)
+            if (end == last or not _is_word_char(text[end + 1]))
+            and (end < len(keyword) or not _is_word_char(text[end - len(keyword)]))
+        )
 
     def _combine_mood_predictions(self, sentiment, emotions, keywords):
         """Combine all mood predictions into final result"""
-        mood_scores = {}
-
-        # Weight different approaches
-        weights = {
-            "sentiment": 0.3,
-            "emotions": 0.4,
-            "keywords": 0.2,
-        }
-
-        # Map sentiment to moods
-        if sentiment["compound"] > 0.5:
-            mood_scores["happy"] = sentiment["compound"] * weights["sentiment"]
-        elif sentiment["compound"] < -0.5:
-            mood_scores["sad"] = abs(sentiment["compound"]) * weights["sentiment"]
-        else:
-            mood_scores["neutral"] = (1 - abs(sentiment["compound"])) * weights[
-                "sentiment"
-            ]
+        return self._combine_mood_predictions_batch([sentiment], [emotions], [keywords])[0]
+
+    def _combine_mood_predictions_batch(self, sentiments, emotions, keywords):
+        """Combine mood predictions for many texts as one (texts x moods) score matrix"""
+        if not sentiments:
+            return []
+
+        n_texts = len(sentiments)
+        rows = np.arange(n_texts)
+        mood_scores = np.zeros((n_texts, len(self._mood_names)))
+
+        # Map sentiment to moods: strong compounds score happy/sad, the rest neutral
+        compound = np.array([sentiment["compound"] for sentiment in sentiments])
+        strength = np.abs(compound)
+        sentiment_ids = np.where(
+            compound > 0.5,
+            self._mood_index["happy"],
+            np.where(compound < -0.5, self._mood_index["sad"], self._mood_index["neutral"]),
+        )
+        mood_scores[rows, sentiment_ids] = np.where(strength > 0.5, strength, 1 - strength) * SENTIMENT_WEIGHT
 
         # Add emotion scores
-        for emotion, score in emotions.items():
-            if emotion in mood_scores:
-                mood_scores[emotion] += score * weights["emotions"]
-            else:
-                mood_scores[emotion] = score * weights["emotions"]
-
-        # Add keyword scores
-        for emotion, score in keywords.items():
-            if emotion in mood_scores:
-                mood_scores[emotion] += score * weights["keywords"]
-            else:
-                mood_scores[emotion] = score * weights["keywords"]
-
-        # Find the mood with highest score
-        if mood_scores:
-            primary_mood = max(mood_scores, key=mood_scores.get)
-            confidence = min(mood_scores[primary_mood], 1.0)
-        else:
-            primary_mood = "neutral"
-            confidence = 0.5
-
-        return {
-            "mood": primary_mood,
-            "confidence": confidence,
-            "all_scores": mood_scores,
-        }
-
-    def _extract_mood_keywords(self, text):
-        """Extract keywords that indicate mood"""
-        keywords = []
-        words = text.split()
-
-        for emotion, emotion_keywords in self.emotion_keywords.items():
-            for keyword in emotion_keywords:
-                if keyword in text:
-                    keywords.append(keyword)
-
-        return list(set(keywords))
+        emotion_rows, emotion_ids, emotion_values = [], [], []
+        for row, text_emotions in enumerate(emotions):
+            for emotion, score in text_emotions.items():
+                mood_id = self._mood_index.get(emotion)
+                if mood_id is not None:
+                    emotion_rows.append(row)
+                    emotion_ids.append(mood_id)
+                    emotion_values.append(score)
+        np.add.at(mood_scores, (emotion_rows, emotion_ids), np.array(emotion_values) * EMOTION_WEIGHT)
+
+        # Add keyword scores (each text's dict is ordered like emotion_keywords)
+        keyword_scores = np.array([list(text_keywords.values()) for text_keywords in keywords], dtype=float)
+        mood_scores[:, self._keyword_mood_ids] += keyword_scores * KEYWORD_WEIGHT
+
+        # Find the mood with highest score; the sentiment mood was always scored
+        # first, so it also wins any tie
+        mood_ids = mood_scores.argmax(axis=1)
+        mood_ids = np.where(mood_scores[rows, sentiment_ids] >= mood_scores[rows, mood_ids], sentiment_ids, mood_ids)
+        confidences = np.minimum(mood_scores[rows, mood_ids], 1.0)
+
+        return [
+            {
+                "mood": self._mood_names[mood_id],
+                "confidence": confidence,
+                "all_scores": dict(zip(self._mood_names, row_scores)),
+            }
+            for mood_id, confidence, row_scores
+            in zip(mood_ids.tolist(), confidences.tolist(), mood_scores.tolist())
+        ]
 
     def _fallback_mood_detection(self, text):
         """Fallback mood detection using simple methods"""
         try:
             # Simple sentiment analysis
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
+            polarity = self.vader_analyzer.polarity_scores(text)["compound"]
 
             if polarity > 0.3:
                 mood = "happy"
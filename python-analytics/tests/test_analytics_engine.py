@@ -0,0 +1,54 @@
+import unittest
+
+from textblob import TextBlob
+
+from services.analytics_engine import AnalyticsEngine
+
+
+class FastPolarityTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = AnalyticsEngine()
+
+    def assertMatchesTextBlob(self, text):
+        self.assertAlmostEqual(self.engine._fast_polarity(text), TextBlob(text).sentiment.polarity)
+
+    def test_quoted_words_are_scored(self):
+        self.assertMatchesTextBlob("I felt 'happy' today")
+
+    def test_modifier_does_not_carry_past_unrelated_words(self):
+        self.assertMatchesTextBlob("so I went home and it was good")
+
+
+class PrepareDataframeTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = AnalyticsEngine()
+
+    def test_date_uses_local_wall_clock_time(self):
+        df = self.engine._prepare_dataframe([{'content': 'late night', 'createdAt': '2024-01-01T23:30:00-05:00'}])
+
+        self.assertEqual(str(df['date'].iloc[0].date()), '2024-01-01')
+        self.assertEqual(df['hour'].iloc[0], 23)
+
+    def test_unparsable_timestamp_keeps_emotion_distribution(self):
+        entries = [
+            {'content': 'a good day', 'mood': 'happy', 'createdAt': '2024-01-01T10:00:00'},
+            {'content': 'a bad day', 'mood': 'sad', 'createdAt': 'not a date'},
+        ]
+
+        distribution = self.engine.analyze_emotion_distribution(entries)
+
+        counts = {item['name']: item['count'] for item in distribution}
+        self.assertEqual(counts, {'Happy': 1, 'Sad': 1})
+
+
+class CountWordsTest(unittest.TestCase):
+    def test_counts_match_str_split(self):
+        texts = ['hello world', 'hello\u00a0world', 'a\u3000b c', 'a\x00b c', 'x\x1cy', '', '  \t ']
+
+        counts = AnalyticsEngine()._count_words(texts)
+
+        self.assertEqual(counts.tolist(), [len(text.split()) for text in texts])
+
+
+if __name__ == "__main__":
+    unittest.main()
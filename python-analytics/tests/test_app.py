@@ -0,0 +1,42 @@
+import unittest
+
+import pandas as pd
+
+from app import app, simple_analytics
+
+
+class SimpleAnalyticsTest(unittest.TestCase):
+    def test_malformed_entries_are_skipped(self):
+        entries = [
+            None,
+            {'mood': 'happy', 'content': 'a good day'},
+            {'mood': 'sad', 'content': 42},
+            {'mood': 'happy', 'content': None},
+            {'mood': ['x'], 'content': 'unhashable mood'},
+        ]
+
+        analytics = simple_analytics(entries)
+
+        counts = {item['name']: item['count'] for item in analytics['emotion_distribution']}
+        self.assertEqual(counts, {'Happy': 2, 'Sad': 1})
+        self.assertEqual(analytics['writing_patterns']['stats']['total_words'], 4)
+
+    def test_generate_insights_with_null_entry(self):
+        response = app.test_client().post('/generate-insights', json={
+            'user_id': 'user-1',
+            'entries': [{'mood': 'calm', 'content': 'quiet evening'}, None],
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['success'])
+
+
+class JsonProviderTest(unittest.TestCase):
+    def test_pandas_timestamps_and_nat(self):
+        body = app.json.dumps({'at': pd.Timestamp('2024-01-01 10:00'), 'missing': pd.NaT})
+
+        self.assertEqual(app.json.loads(body), {'at': '2024-01-01T10:00:00+00:00', 'missing': None})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from services.mood_detector import EMOTION_KEYWORDS, MoodDetector
+
+
+def keyword_scores(**scores):
+    """Keyword scores for one text, ordered like EMOTION_KEYWORDS"""
+    return {emotion: scores.get(emotion, 0.0) for emotion in EMOTION_KEYWORDS}
+
+
+class CombineMoodPredictionsTest(unittest.TestCase):
+    def setUp(self):
+        self.detector = MoodDetector()
+
+    def combine(self, compound, keywords, emotions=None):
+        return self.detector._combine_mood_predictions_batch(
+            [{"compound": compound}], [emotions or {}], [keywords]
+        )[0]
+
+    def test_keyword_tie_resolves_to_first_listed_emotion(self):
+        # "excited" is a keyword of both happy and excited
+        self.assertEqual(self.combine(0.0, keyword_scores(happy=2.0, excited=2.0))["mood"], "happy")
+
+        # "cheated" is a keyword of both sad and angry
+        self.assertEqual(self.combine(0.0, keyword_scores(sad=2.0, angry=2.0))["mood"], "sad")
+
+    def test_sentiment_mood_wins_tie(self):
+        # A strong compound scores happy at 0.8 * 0.3, tied with joy at 0.6 * 0.4
+        result = self.combine(0.8, keyword_scores(), emotions={"joy": 0.6})
+        self.assertEqual(result["mood"], "happy")
+
+
+if __name__ == "__main__":
+    unittest.main()